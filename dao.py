@@ -1,13 +1,20 @@
 import json
 import random
 import asyncio
-import dataclasses
 import os
 import tempfile
+from collections import defaultdict
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Set
+from typing import List, Optional, Dict, Any, Set, Tuple
 from .model import Quote
 
+try:
+    import orjson  # 可选加速：存在时用于语录库的读写
+except ImportError:
+    orjson = None
+
+_EMPTY_SET: frozenset = frozenset()
+
 class QuoteStore:
     def __init__(self, data_dir: Path):
         self.data_dir = data_dir
@@ -17,27 +24,54 @@ class QuoteStore:
         
         # 原始数据缓存
         self._cache: List[Dict[str, Any]] = self._load()
-        # O(1) 快速查重索引 (格式: "{group_id}_{text}")
-        self._index: Set[str] = set()
+        # O(1) 快速查重索引：按群分组的已收录文本集合
+        self._text_sets: Dict[str, Set[str]] = {}
+        # 已存在的语录 ID
+        self._ids: Set[str] = set()
+        # 按 (群, 用户) 归组的语录 ID，保持插入顺序；群为 None 表示跨群汇总
+        self._by_user: Dict[Tuple[Optional[str], str], List[str]] = defaultdict(list)
         self._rebuild_index()
 
     def _load(self) -> List[Dict[str, Any]]:
         if not self.file.exists():
             return []
         try:
-            data = json.loads(self.file.read_text(encoding="utf-8"))
+            if orjson is not None:
+                data = orjson.loads(self.file.read_bytes())
+            else:
+                data = json.loads(self.file.read_text(encoding="utf-8"))
             return data.get("quotes", [])
         except Exception:
             return []
 
     def _rebuild_index(self):
         """重建查重索引"""
-        self._index.clear()
+        self._text_sets.clear()
+        self._ids.clear()
+        self._by_user.clear()
         for q in self._cache:
             gid = str(q.get("group", ""))
             txt = str(q.get("text", "")).strip()
             if gid and txt:
-                self._index.add(f"{gid}_{txt}")
+                self._text_sets.setdefault(gid, set()).add(txt)
+            self._ids.add(q.get("id"))
+            self._index_user(q)
+
+    def _user_keys(self, q: Dict[str, Any]) -> Tuple[Tuple[Optional[str], str], ...]:
+        qq = str(q.get("qq"))
+        return (str(q.get("group")), qq), (None, qq)
+
+    def _index_user(self, q: Dict[str, Any]):
+        for key in self._user_keys(q):
+            self._by_user[key].append(q.get("id"))
+
+    def _unindex_user(self, q: Dict[str, Any]):
+        for key in self._user_keys(q):
+            ids = self._by_user.get(key)
+            if ids and q.get("id") in ids:
+                ids.remove(q.get("id"))
+                if not ids:
+                    del self._by_user[key]
 
     async def _save(self):
         """
@@ -46,19 +80,21 @@ class QuoteStore:
         """
         async with self._lock:
             data = {"quotes": self._cache}
-            json_str = json.dumps(data, ensure_ascii=False, indent=2)
+            if orjson is not None:
+                payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+            else:
+                payload = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
             
             # 创建临时文件
             fd, tmp_path = tempfile.mkstemp(
                 dir=self.data_dir, 
-                text=True, 
                 prefix="quotes_", 
                 suffix=".tmp"
             )
             
             try:
-                with os.fdopen(fd, 'w', encoding='utf-8') as f:
-                    f.write(json_str)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
                 
                 # 原子替换 (在 POSIX 系统上是原子的，Windows 上也比直接写安全)
                 tmp_path_obj = Path(tmp_path)
@@ -69,25 +105,26 @@ class QuoteStore:
                     os.remove(tmp_path)
                 raise e
 
-    def _safe_to_quote(self, data: Dict[str, Any]) -> Quote:
-        """安全转换为 Quote 对象，自动忽略多余字段"""
-        valid_keys = {f.name for f in dataclasses.fields(Quote)}
-        clean_data = {k: v for k, v in data.items() if k in valid_keys}
-        return Quote(**clean_data)
-
     def check_exists(self, group_id: str, text: str) -> bool:
         """检查指定群是否已存在相同文本 (O(1) 复杂度)"""
-        target_text = text.strip()
-        key = f"{group_id}_{target_text}"
-        return key in self._index
+        return text.strip() in self._text_sets.get(str(group_id), _EMPTY_SET)
+
+    def has_quote(self, qid: str) -> bool:
+        """检查语录 ID 是否已被占用"""
+        return qid in self._ids
+
+    def get_texts_set(self, group_id: str) -> Set[str]:
+        """获取指定群已收录文本的集合 (只读视图，调用方不应修改)，供批量查重一次性取用"""
+        return self._text_sets.get(str(group_id), _EMPTY_SET)
 
     async def add_quote(self, quote: Quote):
-        q_dict = dataclasses.asdict(quote)
+        q_dict = quote.to_dict()
         self._cache.append(q_dict)
         
         # 同步更新索引
-        key = f"{quote.group}_{quote.text.strip()}"
-        self._index.add(key)
+        self._text_sets.setdefault(str(quote.group), set()).add(quote.text.strip())
+        self._ids.add(quote.id)
+        self._index_user(q_dict)
         
         await self._save()
 
@@ -103,7 +140,7 @@ class QuoteStore:
             
         if not candidates:
             return None
-        return self._safe_to_quote(random.choice(candidates))
+        return Quote.from_dict(random.choice(candidates))
     
     def get_random_batch(self, group_id: Optional[str], count: int) -> List[Quote]:
         """获取随机语录批次 (用于抽卡)"""
@@ -118,7 +155,7 @@ class QuoteStore:
             
         sample_size = min(len(candidates), count)
         selected = random.sample(candidates, sample_size)
-        return [self._safe_to_quote(x) for x in selected]
+        return [Quote.from_dict(x) for x in selected]
 
     def get_user_quotes(self, group_id: Optional[str], qq: str) -> List[Quote]:
         """获取指定用户的所有语录"""
@@ -128,7 +165,7 @@ class QuoteStore:
                 continue
             if str(q.get("qq")) != str(qq):
                 continue
-            res.append(self._safe_to_quote(q))
+            res.append(Quote.from_dict(q))
         return res
 
     async def delete_quote(self, qid: str) -> bool:
@@ -140,14 +177,20 @@ class QuoteStore:
             # 更新索引
             gid = str(to_delete.get("group", ""))
             txt = str(to_delete.get("text", "")).strip()
-            key = f"{gid}_{txt}"
-            if key in self._index:
-                self._index.remove(key)
+            texts = self._text_sets.get(gid)
+            if texts is not None:
+                texts.discard(txt)
+            self._ids.discard(qid)
+            self._unindex_user(to_delete)
                 
             await self._save()
             return True
             
         return False
 
+    def get_user_qids(self, group_id: Optional[str], qq: str) -> List[str]:
+        """获取指定用户的语录 ID 列表 (按收录顺序)，group_id 为 None 时跨群汇总"""
+        return self._by_user.get((None if group_id is None else str(group_id), str(qq)), [])
+
     def get_raw_data(self) -> List[Dict[str, Any]]:
         return self._cache
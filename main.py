@@ -1,15 +1,23 @@
 from __future__ import annotations
 
+import os
 import time
-import secrets
 import random
 import re
 import asyncio
 import json
 import ast
+import heapq
+import operator
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, Optional, Any, List, Union
 
+try:
+    import orjson  # 可选加速：存在时用于解析 LLM 返回的 JSON
+except ImportError:
+    orjson = None
+
 # AstrBot Imports
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register
@@ -24,18 +32,88 @@ from .renderer import QuoteRenderer
 
 PLUGIN_NAME = "astrbot_plugin_quote_core"
 
+# 去除 LLM 返回中的 Markdown 代码块围栏 (```json ... ```)
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.S)
+# OneBot 消息段中承载纯文本的类型
+_TEXT_TYPES = frozenset(("text", "plain"))
+_NUM_RE = re.compile(r"\d+")
+# LLM 返回中的 JSON 数组部分
+_JSON_ARR_RE = re.compile(r"(\[.*\])", re.DOTALL)
+# 修复 LLM 常见的尾随逗号: [1, 2,] / {"a": 1,}；双引号字符串整体匹配并原样保留，不改动其中内容
+_TRAILING_COMMA_RE = re.compile(r'("(?:[^"\\]|\\.)*")|,\s*([}\]])', re.S)
+
+def _strip_trailing_commas(text: str) -> str:
+    return _TRAILING_COMMA_RE.sub(lambda m: m.group(1) or m.group(2), text)
+
+# 允许交给 ast.literal_eval 兜底解析的最大长度
+_LITERAL_EVAL_MAX_LEN = 32 * 1024
+# 免前缀触发的路由：合并为单个带命名分组的正则，一次 match 即可选出处理函数
+_ROUTER_RE = re.compile(
+    r"^(?:(?P<add>上传\(|添加语录\))"
+    r"|(?P<rand>(?:语录|随机语录|抽卡)(?:[\s\d].*)?$)"
+    r"|(?P<delete>删除\(|删除语录\))"
+    r"|(?P<ai>一键金句\(|智能收录\)))"
+)
+# AI 结果回查索引的分片长度
+_SHINGLE_LEN = 6
+# AI 结果回查时的归一化：去除空白 / 再去除标点并忽略大小写
+_WS_RE = re.compile(r"\s+")
+_LOOSE_RE = re.compile(r"[\W_]+")
+
+def _provider_config_id(p):
+    cfg = p.provider_config
+    return cfg.get("id") if isinstance(cfg, dict) else None
+
+# 依次尝试读取 Provider 标识的取值函数，属性缺失时抛出 AttributeError
+_PROVIDER_ID_GETTERS = (
+    operator.attrgetter("id"),
+    operator.attrgetter("provider_id"),
+    _provider_config_id,
+)
+
+# 历史消息拉取：单批条数与并发窗口数
+_HISTORY_BATCH_SIZE = 100
+_HISTORY_CONCURRENCY = 4
+# 相邻两次历史拉取的最小间隔 (秒)
+_HISTORY_MIN_INTERVAL = 0.05
+
+# OneBot API 单次调用超时 (秒)
+_API_TIMEOUT = 5.0
+
+# 群名片缓存有效期 (秒)
+_NAME_CACHE_TTL = 300
+_NAME_CACHE_SIZE = 2048
+
+# 语录 ID 随机字节的预取批量
+_QID_POOL_SIZE = 32
+
+# 按群记录的状态 (最近发送的语录 / 戳一戳冷却) 最多保留的群数量
+_MAX_TRACKED_GROUPS = 512
+
+# 配置项 card_style -> 渲染器布局名 ("自动" 不在表中，交由渲染器按文本长度选择)
+_CARD_STYLES = {"朋友圈": "feed", "卡片": "vertical"}
+
 @register(PLUGIN_NAME, "jengaklll-a11y", "支持多群隔离/混合、HTML卡片渲染和长图生成、Ai一键捕捉上传", "2.0.7")
 class QuotesPlugin(Star):
     def __init__(self, context: Context, config: Dict = None):
         super().__init__(context)
         self.config = config or {}
+        self._ignore_prefix = bool(self.config.get("ignore_prefix", False))
+        self._card_style = _CARD_STYLES.get(self.config.get("card_style", "自动"))
         
         # 获取标准数据目录
         self.data_dir = Path(StarTools.get_data_dir(PLUGIN_NAME))
         self.store = QuoteStore(self.data_dir)
         
-        self._last_sent_qid: Dict[str, str] = {}
-        self._poke_cooldowns: Dict[str, float] = {}
+        self._last_sent_qid: OrderedDict[str, str] = OrderedDict()
+        self._poke_cooldowns: OrderedDict[str, float] = OrderedDict()
+        # 指定模型的查找结果缓存 (key 为配置中的 provider id)
+        self._provider_cache: Dict[str, Any] = {}
+        # 群名片缓存: (group_id, user_id) -> (名片, 写入时间)
+        self._name_cache: OrderedDict[tuple, tuple] = OrderedDict()
+        # 正在进行中的群名片查询，同 key 的并发调用共享同一结果
+        self._name_inflight: Dict[tuple, asyncio.Future] = {}
+        self._qid_pool: List[str] = []
 
         # [新增] 自动检测本地 logo.png 并注入到渲染器
         curr_dir = Path(__file__).parent
@@ -48,13 +126,21 @@ class QuotesPlugin(Star):
                 logger.info(f"QuoteCore: 已加载本地默认头像: {p.name}")
                 break
 
-        # 正则路由
-        self.regex_routes = [
-            (re.compile(r"^上传\(|^添加语录\)"), self._logic_add),
-            (re.compile(r"^(语录|随机语录|抽卡)([\s\d].*)?$"), self._logic_random),
-            (re.compile(r"^删除\(|^删除语录\)"), self._logic_delete),
-            (re.compile(r"^一键金句\(|^智能收录\)"), self._logic_ai_analysis)
-        ]
+        # 检测本地字体 (fonts/ 或 assets/fonts/ 下的 .woff2，每个字重一个文件)，有则不再请求 Google Fonts
+        for font_dir in (curr_dir / "fonts", curr_dir / "assets" / "fonts"):
+            fonts = sorted(font_dir.glob("*.woff2")) if font_dir.is_dir() else []
+            if fonts:
+                QuoteRenderer.use_local_fonts(fonts)
+                logger.info(f"QuoteCore: 已加载本地字体: {', '.join(f.name for f in fonts)}")
+                break
+
+        # 正则路由 (分组名 -> 处理函数，见 _ROUTER_RE)
+        self._route_handlers = {
+            "add": self._logic_add,
+            "rand": self._logic_random,
+            "delete": self._logic_delete,
+            "ai": self._logic_ai_analysis,
+        }
 
     # ================= 1. 指令注册 =================
     
@@ -90,28 +176,23 @@ class QuotesPlugin(Star):
         if event.get_sender_id() == self_id:
             return
 
-        is_poke = False
-        for seg in event.message_obj.message:
-            if isinstance(seg, Comp.Poke):
-                is_poke = True
-                break
-        
-        if is_poke:
-            async for res in self._logic_poke(event):
+        poke_seg = next((seg for seg in event.message_obj.message if isinstance(seg, Comp.Poke)), None)
+        if poke_seg is not None:
+            async for res in self._logic_poke(event, poke_seg):
                 yield res
             return
 
-        if not self.config.get("ignore_prefix", False):
+        if not self._ignore_prefix or not event.message_obj.message:
             return
 
-        raw_text = "".join([s.text for s in event.message_obj.message if isinstance(s, Comp.Plain)]).strip()
-        if not raw_text:
+        raw_text = self._raw_text(event).strip()
+        if not raw_text or raw_text.startswith(("/", "!", "！")):
             return
 
-        for pattern, logic_func in self.regex_routes:
-            if pattern.match(raw_text) and not raw_text.startswith(("/", "!", "！")):
-                async for res in logic_func(event):
-                    yield res
+        m = _ROUTER_RE.match(raw_text)
+        if m:
+            async for res in self._route_handlers[m.lastgroup](event):
+                yield res
 
     # ================= 3. 核心业务逻辑 =================
 
@@ -172,10 +253,10 @@ class QuotesPlugin(Star):
             return
 
         max_quotes = max(1, self.config.get("max_golden_quotes", 1))
-        prompt = self._build_prompt(context_str, max_quotes)
+        system_prompt, user_prompt = self._build_prompt(context_str, max_quotes)
         
         try:
-            resp = await provider.text_chat(prompt, session_id=None)
+            resp = await provider.text_chat(user_prompt, session_id=None, system_prompt=system_prompt)
             data_list = self._parse_llm_json(resp)
         except Exception as e:
             logger.error(f"AI Call Error: {e}")
@@ -191,10 +272,12 @@ class QuotesPlugin(Star):
         if not saved_quotes:
             yield event.plain_result("🤔 AI 推荐了一些内容，但它们要么是重复的，要么我没在记录里找到原文。")
         else:
-            yield event.plain_result(f"🎉 成功挖掘 {len(saved_quotes)} 条金句！正在生成语录卡片...")
             bot_qq = self._get_self_id(event) or "10000"
             html, opts = QuoteRenderer.render_merged_card(saved_quotes, bot_qq, "智能金句挖掘", True)
-            img = await self.html_render(html, {}, options=opts)
+            # 先启动渲染，再发送提示，让消息投递与截图渲染并行
+            render_task = asyncio.create_task(self.html_render(html, {}, options=opts))
+            yield event.plain_result(f"🎉 成功挖掘 {len(saved_quotes)} 条金句！正在生成语录卡片...")
+            img = await render_task
             yield event.image_result(img)
 
     def _resolve_provider(self, event):
@@ -211,6 +294,7 @@ class QuotesPlugin(Star):
         blacklist = self.config.get("user_blacklist", []) or []
         msgs_text = []
         valid_msgs_map = {}
+        existing_texts = self.store.get_texts_set(group_id)
 
         for m in history_msgs:
             sender = m.get("sender", {})
@@ -223,7 +307,7 @@ class QuotesPlugin(Star):
             text = self._extract_plaintext_from_onebot_message(raw_msg)
             if not text or len(text) < 2: continue
             
-            if self.store.check_exists(group_id, text): continue
+            if text in existing_texts: continue
 
             name = sender.get("card") or sender.get("nickname") or "未知"
             valid_msgs_map[text] = m
@@ -232,13 +316,12 @@ class QuotesPlugin(Star):
         return "\n".join(msgs_text), valid_msgs_map
 
     def _build_prompt(self, context_str, max_quotes):
-        return (
-            f"请作为一名眼光极高的“金句鉴赏家”，从以下群聊记录中挑选出 **{max_quotes}** 句最具备“金句”潜质的发言。\n\n"
+        """返回 (系统提示词, 用户提示词)：固定的判定标准与格式要求放在前者，便于服务端前缀缓存"""
+        system_prompt = (
+            f"请作为一名眼光极高的“金句鉴赏家”，从用户给出的群聊记录中挑选出 **{max_quotes}** 句最具备“金句”潜质的发言。\n\n"
             "## 判定标准（宁缺毋滥）：\n"
             "1. **核心标准**：**极为精彩的发言**。必须具备颠覆常识的脑洞、逻辑跳脱的表达、强烈反差感或独特的抽象思维。\n"
             "2. **拒绝平庸**：**绝对不要选**普通的日常对话、单纯的玩梗复读、水群废话。\n\n"
-            "## 聊天记录：\n"
-            f"{context_str}\n\n"
             "## 返回格式：\n"
             "请仅返回一个纯 JSON **数组**（Array），不要包含 Markdown 标记。\n"
             "[\n"
@@ -248,27 +331,100 @@ class QuotesPlugin(Star):
             "  }\n"
             "]"
         )
+        user_prompt = f"## 聊天记录：\n{context_str}"
+        return system_prompt, user_prompt
 
     def _parse_llm_json(self, resp) -> List[Dict]:
         if not resp or not hasattr(resp, "completion_text") or not resp.completion_text:
             return []
         
         llm_text = resp.completion_text.strip()
-        json_match = re.search(r"(\[.*\])", llm_text, re.DOTALL)
-        json_str = json_match.group(1) if json_match else llm_text.replace("```json", "").replace("```", "").strip()
+        json_match = _JSON_ARR_RE.search(llm_text)
+        json_str = json_match.group(1) if json_match else _FENCE_RE.sub("", llm_text)
         
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError:
+        # 依次尝试：原文 -> 去除尾随逗号后的修复版本
+        for candidate in (json_str, _strip_trailing_commas(json_str)):
+            try:
+                return self._json_loads(candidate)
+            except json.JSONDecodeError:
+                continue
+
+        # 最后兜底兼容单引号等 Python 字面量写法，过长文本不做 AST 解析
+        if len(json_str) < _LITERAL_EVAL_MAX_LEN:
             try:
                 return ast.literal_eval(json_str)
             except Exception:
-                logger.error(f"JSON Parse Failed. Raw: {llm_text}")
-                return []
+                pass
+        logger.error(f"JSON Parse Failed. Raw: {llm_text}")
+        return []
+
+    @staticmethod
+    def _json_loads(text: str):
+        if orjson is not None:
+            return orjson.loads(text.encode("utf-8"))
+        return json.loads(text)
+
+    def _build_match_index(self, valid_msgs_map) -> tuple:
+        """
+        预构建 AI 结果回查索引，整批结果共用一份：
+        - shingles: 原文中每个定长片段 -> 原文列表 (用于 content in 原文)
+        - heads: 原文开头片段 -> 原文列表 (用于 原文 in content)
+        - short_texts: 短于分片长度、无法建索引的原文
+        - norm_map / loose_map: 归一化文本 -> 原文，用于忽略空白/标点差异的 O(1) 命中
+        """
+        shingles: Dict[str, List[str]] = {}
+        heads: Dict[str, List[str]] = {}
+        short_texts: List[str] = []
+        order = {}
+        norm_map: Dict[str, str] = {}
+        loose_map: Dict[str, str] = {}
+        for i, text in enumerate(valid_msgs_map):
+            order[text] = i
+            norm_map.setdefault(_WS_RE.sub("", text), text)
+            loose = _LOOSE_RE.sub("", text).lower()
+            if loose: loose_map.setdefault(loose, text)
+            if len(text) < _SHINGLE_LEN:
+                short_texts.append(text)
+                continue
+            heads.setdefault(text[:_SHINGLE_LEN], []).append(text)
+            for sh in {text[j:j + _SHINGLE_LEN] for j in range(len(text) - _SHINGLE_LEN + 1)}:
+                shingles.setdefault(sh, []).append(text)
+        return shingles, heads, short_texts, order, norm_map, loose_map
+
+    def _match_source_message(self, content, valid_msgs_map, match_index):
+        """将 AI 返回的内容回查到原始消息：精确命中 -> 归一化命中 -> 索引候选中的子串匹配"""
+        msg = valid_msgs_map.get(content)
+        if msg is not None:
+            return content, msg
+
+        shingles, heads, short_texts, order, norm_map, loose_map = match_index
+        k = norm_map.get(_WS_RE.sub("", content))
+        if k is None:
+            loose = _LOOSE_RE.sub("", content).lower()
+            k = loose_map.get(loose) if loose else None
+        if k is not None:
+            return k, valid_msgs_map[k]
+
+        if len(content) < _SHINGLE_LEN:
+            # 过短无法分片，退回全量扫描
+            candidates = valid_msgs_map
+        else:
+            found = set(shingles.get(content[:_SHINGLE_LEN], ()))
+            for j in range(len(content) - _SHINGLE_LEN + 1):
+                found.update(heads.get(content[j:j + _SHINGLE_LEN], ()))
+            found.update(short_texts)
+            # 保持与原消息顺序一致，命中结果与逐条扫描相同
+            candidates = sorted(found, key=order.__getitem__)
+
+        for k in candidates:
+            if content in k or k in content:
+                return k, valid_msgs_map[k]
+        return content, None
 
     async def _process_ai_results(self, event, data_list, valid_msgs_map, group_id) -> List[Quote]:
         saved_quotes = []
         if isinstance(data_list, dict): data_list = [data_list]
+        match_index = self._build_match_index(valid_msgs_map)
         
         for item in data_list:
             if not isinstance(item, dict): continue
@@ -278,15 +434,7 @@ class QuotesPlugin(Star):
             
             if not content or content.upper() in ["NULL", "无"]: continue
 
-            matched_msg = None
-            if content in valid_msgs_map:
-                matched_msg = valid_msgs_map[content]
-            else:
-                for k, v in valid_msgs_map.items():
-                    if content in k or k in content:
-                        matched_msg = v
-                        content = k 
-                        break
+            content, matched_msg = self._match_source_message(content, valid_msgs_map, match_index)
             
             if matched_msg:
                 sender = matched_msg.get("sender", {})
@@ -301,7 +449,7 @@ class QuotesPlugin(Star):
         return saved_quotes
 
     async def _fetch_next_batch_robust(self, client, group_id, cursor_seq, error_strike_ref):
-        batch_size = 100 
+        batch_size = _HISTORY_BATCH_SIZE
         MAX_RETRY_STRIKE = 15 
         
         if error_strike_ref[0] > MAX_RETRY_STRIKE:
@@ -311,7 +459,7 @@ class QuotesPlugin(Star):
             payload = {"group_id": int(group_id), "count": batch_size, "reverseOrder": True}
             if cursor_seq > 0: payload["message_seq"] = cursor_seq
 
-            res = await client.api.call_action("get_group_msg_history", **payload)
+            res = await self._call_api(client, "get_group_msg_history", **payload)
             if not res or not isinstance(res, dict): return [], 0, False
             
             batch = res.get("messages", [])
@@ -331,48 +479,129 @@ class QuotesPlugin(Star):
                 return [], new_cursor, False 
             return [], 0, False
 
+    async def _probe_next_batch_parallel(self, client, group_id, cursor_seq, error_strike_ref):
+        """连续失败时并发探测两个跳跃距离，优先采用较近游标的成功结果"""
+        strike = error_strike_ref[0]
+        far_cursor = cursor_seq - 50 * (2 ** (min(strike, 8) - 1))
+        if far_cursor <= 0:
+            return await self._fetch_next_batch_robust(client, group_id, cursor_seq, error_strike_ref)
+
+        strike_refs = [[strike], [strike]]
+        results = await asyncio.gather(
+            self._fetch_next_batch_robust(client, group_id, cursor_seq, strike_refs[0]),
+            self._fetch_next_batch_robust(client, group_id, far_cursor, strike_refs[1]),
+        )
+        for result, ref in zip(results, strike_refs):
+            if result[2]:
+                error_strike_ref[0] = ref[0]
+                return result
+        # 两路都失败：沿较远的探测继续跳跃
+        error_strike_ref[0] = strike_refs[1][0]
+        return results[1]
+
+    async def _fetch_windows_parallel(self, client, group_id, cursor_seq, windows):
+        """
+        按 message_seq 向前外推多个窗口并发拉取，返回 (消息, 下一游标, 是否可继续外推)。
+        外推的游标必须为正：游标 <= 0 时请求不带 message_seq，会重复拉到最新一页。
+        """
+        windows = min(windows, (cursor_seq - 1) // _HISTORY_BATCH_SIZE + 1)
+        results = await asyncio.gather(*[
+            self._fetch_next_batch_robust(client, group_id, cursor_seq - k * _HISTORY_BATCH_SIZE, [0])
+            for k in range(windows)
+        ])
+        merged = []
+        next_cursor = cursor_seq
+        # 只采用从当前游标起连续成功的窗口，保证游标之后没有空洞
+        for batch, cursor, success in results:
+            if not success:
+                return merged, next_cursor, False
+            if not batch:
+                return merged, 0, True
+            merged.extend(batch)
+            next_cursor = cursor
+            # 不足一整批说明已接近历史起点，后续窗口不再可信，交回逐批拉取
+            if len(batch) < _HISTORY_BATCH_SIZE:
+                return merged, next_cursor, False
+        return merged, next_cursor, True
+
+    @staticmethod
+    def _merge_unique(seen: Dict[str, Dict], batch: List[Dict]):
+        for m in batch:
+            mid = str(m.get("message_id"))
+            if mid not in seen:
+                seen[mid] = m
+
     async def _fetch_history_robust_main(self, event, group_id, total_count) -> List[Dict]:
         client = event.bot
-        collected_messages = []
+        seen: Dict[str, Dict] = {}
         cursor_seq = 0
         error_strike = [0] 
         max_loops = int(total_count / 50) + 20 
+        windowed = True
+        loop = asyncio.get_running_loop()
+        last_call = 0.0
         
         for _ in range(max_loops):
-            if len(collected_messages) >= total_count: break
+            if len(seen) >= total_count: break
             
-            batch, next_cursor, success = await self._fetch_next_batch_robust(
-                client, group_id, cursor_seq, error_strike
-            )
+            # 自适应节流：仅在距上次请求不足最小间隔时补足等待
+            wait = _HISTORY_MIN_INTERVAL - (loop.time() - last_call)
+            if wait > 0: await asyncio.sleep(wait)
+            
+            # 首批确定游标后，剩余部分按窗口并发拉取；任一窗口出错即回退为逐批拉取
+            remaining_batches = -(-(total_count - len(seen)) // _HISTORY_BATCH_SIZE)
+            if windowed and cursor_seq > 0 and error_strike[0] == 0 and remaining_batches > 1:
+                batch, next_cursor, ok = await self._fetch_windows_parallel(
+                    client, group_id, cursor_seq, min(_HISTORY_CONCURRENCY, remaining_batches)
+                )
+                last_call = loop.time()
+                self._merge_unique(seen, batch)
+                if not ok: windowed = False
+                if next_cursor <= 0: break
+                cursor_seq = next_cursor
+                continue
+            
+            fetch = self._probe_next_batch_parallel if error_strike[0] >= 4 else self._fetch_next_batch_robust
+            batch, next_cursor, success = await fetch(client, group_id, cursor_seq, error_strike)
+            last_call = loop.time()
             
             if not success:
                 if next_cursor <= 0: break
                 cursor_seq = next_cursor
-                await asyncio.sleep(0.1)
+                # 连续失败时指数退避
+                await asyncio.sleep(min(0.1 * 2 ** error_strike[0], 2.0))
                 continue
             
             if not batch: break
-            collected_messages.extend(batch)
+            self._merge_unique(seen, batch)
             cursor_seq = next_cursor
-            await asyncio.sleep(0.2)
         
-        unique_msgs = {str(m.get("message_id")): m for m in collected_messages}.values()
-        sorted_msgs = sorted(unique_msgs, key=lambda x: x.get("time", 0))
-        return sorted_msgs[-total_count:]
+        # 只取最新的 total_count 条，再恢复为时间正序
+        latest = heapq.nlargest(
+            total_count, ((m.get("time", 0), i, m) for i, m in enumerate(seen.values()))
+        )
+        return [m for _t, _i, m in reversed(latest)]
 
     def _force_find_provider(self, target_id: str):
         if not target_id: return None
-        target_id_lower = target_id.lower()
         all_providers = []
         if hasattr(self.context, "get_all_providers"):
             all_providers = self.context.get_all_providers()
         
+        # 缓存的实例仍在当前 Provider 列表中才复用 (Provider 重载/编辑后会换成新实例)
+        cached = self._provider_cache.get(target_id)
+        if cached is not None and any(p is cached for p in all_providers):
+            return cached
+        
+        target_id_lower = target_id.lower()
         for p in all_providers:
-            ids = []
-            if hasattr(p, "id"): ids.append(str(p.id))
-            if hasattr(p, "provider_id"): ids.append(str(p.provider_id))
-            for pid in ids:
-                if pid.lower() == target_id_lower:
+            for getter in _PROVIDER_ID_GETTERS:
+                try:
+                    pid = getter(p)
+                except AttributeError:
+                    continue
+                if pid and str(pid).lower() == target_id_lower:
+                    self._provider_cache[target_id] = p
                     return p
         return None
 
@@ -388,7 +617,7 @@ class QuotesPlugin(Star):
         if self.store.check_exists(group_id, clean_text): return "DUPLICATE"
         
         created_at_ts = float(origin_time) if origin_time else time.time()
-        qid = secrets.token_hex(4)
+        qid = self._new_qid()
         quote = Quote(
             id=qid, qq=str(target_qq), name=str(target_name), 
             text=clean_text, created_by=event.get_sender_id(),
@@ -397,6 +626,16 @@ class QuotesPlugin(Star):
         await self.store.add_quote(quote)
         return quote
 
+    def _new_qid(self) -> str:
+        """生成 8 位十六进制语录 ID：一次预取一批随机字节，并避开库中已有的 ID"""
+        while True:
+            if not self._qid_pool:
+                raw = os.urandom(4 * _QID_POOL_SIZE)
+                self._qid_pool = [raw[i:i + 4].hex() for i in range(0, len(raw), 4)]
+            qid = self._qid_pool.pop()
+            if not self.store.has_quote(qid):
+                return qid
+
     async def _logic_random(self, event: AstrMessageEvent):
         current_group_id = str(event.get_group_id())
         is_global = self.config.get("global_mode", False)
@@ -413,8 +652,7 @@ class QuotesPlugin(Star):
         if not target_qq and "自己" in event.message_str:
             target_qq = str(event.get_sender_id())
             
-        raw_text = "".join([s.text for s in event.message_obj.message if isinstance(s, Comp.Plain)])
-        nums = re.findall(r"\d+", raw_text)
+        nums = _NUM_RE.findall(self._raw_text(event))
         if nums and int(nums[0]) > 0:
             target_count = min(int(nums[0]), max_limit)
         
@@ -454,14 +692,13 @@ class QuotesPlugin(Star):
             yield event.plain_result("暂无语录。")
             return
         
-        self._last_sent_qid[current_group_id] = quote.id
+        self._lru_put(self._last_sent_qid, current_group_id, quote.id)
         await self._refresh_quote_name(event, current_group_id, quote)
         
-        all_data = self.store.get_raw_data()
-        subset = [q for q in all_data if (str(q.get("group"))==current_group_id or is_global) and str(q.get("qq"))==str(quote.qq)]
-        idx = next((i+1 for i,q in enumerate(subset) if q.get("id")==quote.id), 0)
+        user_qids = self.store.get_user_qids(search_group_id, quote.qq)
+        idx = user_qids.index(quote.id) + 1 if quote.id in user_qids else 0
         
-        html, opts = QuoteRenderer.render_single_card(quote, idx, len(subset))
+        html, opts = QuoteRenderer.render_single_card(quote, idx, len(user_qids), self._card_style)
         img = await self.html_render(html, {}, options=opts)
         yield event.image_result(img)
 
@@ -482,7 +719,7 @@ class QuotesPlugin(Star):
         else:
             yield event.plain_result("删除失败。")
 
-    async def _logic_poke(self, event: AstrMessageEvent):
+    async def _logic_poke(self, event: AstrMessageEvent, poke_seg):
         mode_str = self.config.get("poke_mode", "仅戳Bot")
         if mode_str == "关闭": return
             
@@ -493,17 +730,17 @@ class QuotesPlugin(Star):
         if now - self._poke_cooldowns.get(group_id, 0) < cooldown: return
             
         is_trigger = False
-        poke_target = None
-        for seg in event.message_obj.message:
-            if isinstance(seg, Comp.Poke):
-                poke_target = str(getattr(seg, "qq", "") or getattr(seg, "target", "") or "")
-                break
-        
         if mode_str == "任意戳": is_trigger = True
-        elif str(poke_target) == str(self._get_self_id(event)): is_trigger = True
+        else:
+            poke_target = str(getattr(poke_seg, "qq", "") or getattr(poke_seg, "target", "") or "")
+            is_trigger = poke_target == str(self._get_self_id(event))
             
         if is_trigger:
-            self._poke_cooldowns[group_id] = now
+            # 顺带清理已过冷却期的群，避免长期运行时无限增长
+            expired = [gid for gid, ts in self._poke_cooldowns.items() if now - ts > cooldown]
+            for gid in expired:
+                del self._poke_cooldowns[gid]
+            self._lru_put(self._poke_cooldowns, group_id, now)
             async for res in self._logic_random(event): yield res
     
     async def _refresh_quote_name(self, event, group_id, quote):
@@ -512,20 +749,68 @@ class QuotesPlugin(Star):
             if n: quote.name = n
         except: pass
 
+    @staticmethod
+    def _lru_put(cache: OrderedDict, key, value, maxsize: int = _MAX_TRACKED_GROUPS):
+        """写入有界 LRU 字典，超出上限时淘汰最久未写入的条目"""
+        if key in cache:
+            cache.move_to_end(key)
+        elif len(cache) >= maxsize:
+            cache.popitem(last=False)
+        cache[key] = value
+
+    def _raw_text(self, event) -> str:
+        """拼接消息中的纯文本段，结果缓存在 event 上供同一消息的后续逻辑复用"""
+        cached = getattr(event, "_qc_raw_text", None)
+        if cached is None:
+            plain_cls = Comp.Plain
+            cached = "".join(s.text for s in event.message_obj.message if type(s) is plain_cls)
+            event._qc_raw_text = cached
+        return cached
+
     def _get_self_id(self, event) -> Optional[str]:
-        if hasattr(event.message_obj, "self_id") and event.message_obj.self_id:
-            return str(event.message_obj.self_id)
-        return str(event.raw_event.get("self_id", "")) if hasattr(event, "raw_event") else None
+        """读取 Bot 自身 QQ，结果缓存在 event 上供同一消息的后续逻辑复用"""
+        cached = getattr(event, "_qc_self_id", None)
+        if cached is None:
+            if hasattr(event.message_obj, "self_id") and event.message_obj.self_id:
+                cached = str(event.message_obj.self_id)
+            elif hasattr(event, "raw_event"):
+                cached = str(event.raw_event.get("self_id", ""))
+            else:
+                return None
+            event._qc_self_id = cached
+        return cached
+
+    async def _call_api(self, client, action: str, **params):
+        """调用 OneBot API，并以 _API_TIMEOUT 限制单次调用耗时"""
+        return await asyncio.wait_for(client.api.call_action(action, **params), timeout=_API_TIMEOUT)
 
     async def _get_current_name(self, event, group_id, user_id):
         if event.get_platform_name() != "aiocqhttp": return ""
+        key = (str(group_id), str(user_id))
+        now = time.time()
+        cached = self._name_cache.get(key)
+        if cached and now - cached[1] < _NAME_CACHE_TTL:
+            return cached[0]
+
+        inflight = self._name_inflight.get(key)
+        if inflight:
+            return await asyncio.shield(inflight)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._name_inflight[key] = fut
+        name = ""
         try:
             client = event.bot
             if group_id:
-                ret = await client.api.call_action("get_group_member_info", group_id=int(group_id), user_id=int(user_id), no_cache=True)
-                if ret: return (ret.get("card") or ret.get("nickname") or "").strip()
+                ret = await self._call_api(client, "get_group_member_info", group_id=int(group_id), user_id=int(user_id), no_cache=True)
+                if ret:
+                    name = (ret.get("card") or ret.get("nickname") or "").strip()
+                    self._lru_put(self._name_cache, key, (name, now), _NAME_CACHE_SIZE)
         except: pass
-        return ""
+        finally:
+            self._name_inflight.pop(key, None)
+            fut.set_result(name)
+        return name
 
     def _get_reply_message_id(self, event) -> Optional[str]:
         for seg in event.get_messages(): 
@@ -536,12 +821,18 @@ class QuotesPlugin(Star):
     async def _fetch_onebot_msg(self, event, mid) -> Dict:
         if event.get_platform_name() != "aiocqhttp": return {}
         try:
-            return await event.bot.api.call_action("get_msg", message_id=int(str(mid))) or {}
+            return await self._call_api(event.bot, "get_msg", message_id=int(str(mid))) or {}
         except: return {}
 
     def _extract_plaintext_from_onebot_message(self, message) -> Optional[str]:
+        if not message or not isinstance(message, list): return None
         try:
-            if isinstance(message, list):
-                return "".join([str(m.get("data",{}).get("text","")) for m in message if m.get("type") in ("text","plain")]).strip() or None
+            parts = []
+            for m in message:
+                if m.get("type") in _TEXT_TYPES:
+                    d = m.get("data")
+                    v = d and d.get("text")
+                    if v: parts.append(v if type(v) is str else str(v))
+            return "".join(parts).strip() or None
         except: pass
         return None
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Dict, Any
 
-@dataclass
+@dataclass(slots=True)
 class Quote:
     id: str
     qq: str
@@ -11,3 +11,12 @@ class Quote:
     created_at: float
     group: str         # 群组 ID 用于隔离
     ai_reason: Optional[str] = None # AI 推荐理由 (可选)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """按字段顺序转为字典 (浅拷贝，避免 dataclasses.asdict 的递归深拷贝)"""
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Quote":
+        """从字典构建，自动忽略多余字段"""
+        return cls(**{k: data[k] for k in cls.__slots__ if k in data})
@@ -1,13 +1,36 @@
-import html
+import base64
+import re
 import time
-from datetime import datetime
-from typing import List, Tuple, Dict, Any
+from functools import lru_cache
+from pathlib import Path
+from string import Template
+from typing import List, Tuple, Dict, Any, Optional
 from .model import Quote
 
 # --- HTML 模板常量 ---
 
+# 字体：默认从 Google Fonts 加载；插件目录附带本地字体时由 main.py 通过 use_local_fonts 切换
+_REMOTE_FONT_CSS = "@import url('https://fonts.googleapis.com/css2?family=Noto+Sans+SC:wght@300;400;500;700&display=swap');"
+_font_css = _REMOTE_FONT_CSS
+
+# 字体文件名中的字重关键字 -> font-weight (组合词在前，避免 SemiBold 被识别为 Bold)
+_FONT_WEIGHTS = (
+    ("extralight", "200"), ("ultralight", "200"), ("semibold", "600"), ("demibold", "600"),
+    ("extrabold", "800"), ("ultrabold", "800"), ("thin", "100"), ("light", "300"),
+    ("regular", "400"), ("medium", "500"), ("bold", "700"), ("black", "900"), ("heavy", "900"),
+)
+
+def _font_weight(font_path: Path) -> str:
+    """按文件名推断字重；可变字体 (文件名含 wght / variable) 覆盖 100-900，无法识别时按常规字重处理"""
+    stem = re.sub(r"[\s_-]+", "", font_path.stem.lower())
+    if "wght" in stem or "variable" in stem:
+        return "100 900"
+    for keyword, weight in _FONT_WEIGHTS:
+        if keyword in stem:
+            return weight
+    return "400"
+
 COMMON_CSS = """
-    @import url('https://fonts.googleapis.com/css2?family=Noto+Sans+SC:wght@300;400;500;700&display=swap');
     * { box-sizing: border-box; }
     body {
         margin: 0; padding: 0;
@@ -17,6 +40,296 @@ COMMON_CSS = """
     }
 """
 
+# HTML 转义：单次 str.translate 替换 & < > " '，结果与 html.escape(s, quote=True) 一致
+_HTML_ESCAPE_TABLE = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#x27;"})
+_NEEDS_ESCAPE = re.compile(r"[&<>\"']").search
+
+def _escape(s: str) -> str:
+    # 大多数语录不含 HTML 特殊字符，先做一次只读扫描，命中才替换
+    if not _NEEDS_ESCAPE(s):
+        return s
+    return s.translate(_HTML_ESCAPE_TABLE)
+
+# 模板中的转义占位符 -> 原始字段名
+_ESCAPED_KEYS = {"safe_name": "name", "safe_text": "text"}
+
+class _EscapedFields(dict):
+    """传给 Template.substitute 的字段表：safe_* 占位符在模板取值时才从原始字段转义得到"""
+    __slots__ = ()
+
+    def __missing__(self, key):
+        return _escape(self[_ESCAPED_KEYS[key]])
+
+_CSS_COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+_CSS_SPACE_RE = re.compile(r"\s+")
+_CSS_PUNCT_RE = re.compile(r"\s*([{};:,])\s*")
+
+def _minify_css(css: str) -> str:
+    """去除注释与多余空白，缩小发送给渲染端的页面体积"""
+    css = _CSS_SPACE_RE.sub(" ", _CSS_COMMENT_RE.sub("", css))
+    return _CSS_PUNCT_RE.sub(r"\1", css).strip()
+
+def _compile(css: str, body: str, **css_vars) -> Template:
+    """导入时一次性拼好 <head> 样式与页面骨架并编译模板，渲染时只替换 body 中的占位符"""
+    css = _minify_css(_font_css + COMMON_CSS + Template(css).substitute(css_vars))
+    return Template(
+        f"<html>\n<head>\n<style>{css}</style>\n</head>\n<body>\n{body}\n</body>\n</html>\n"
+    )
+
+# 可格式化的时间戳上限 (3000-01-01)，更大的值在部分平台上 localtime 会报错
+_MAX_TIMESTAMP = 32503680000
+
+# 渲染热路径上的时间函数，绑定为模块级名称省去每次的属性查找
+_localtime = time.localtime
+_now = time.time
+
+_MONTHS = ("", "Jan", "Feb", "Mar", "Apr", "May", "Jun",
+           "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+# 00-99 的两位数字文本，时间格式化时查表代替格式说明符
+_TWO_DIGIT = tuple(f"{i:02d}" for i in range(100))
+
+# 各布局的画布尺寸
+_FEED_WIDTH = 1500
+_VERTICAL_WIDTH = 1500
+_VERTICAL_MIN_HEIGHT = 800
+_MERGED_WIDTH = 1000
+# 合集长图条目字号：短于 _MERGED_SHORT_TEXT_LEN 字的语录使用大字号
+_MERGED_SHORT_TEXT_LEN = 50
+_MERGED_FONT_SIZE = 46
+_MERGED_FONT_SIZE_LONG = 38
+
+# 各布局的样式表 (静态常量，导入时一次性嵌入模板)
+_FEED_CSS = """
+body {
+    width: ${width}px; max-width: ${width}px;
+    padding: 100px;
+    display: flex; flex-direction: column;
+}
+.feed-container { width: 100%; display: flex; flex-direction: row; align-items: flex-start; }
+.avatar-box { margin-right: 60px; flex-shrink: 0; }
+.avatar { width: 180px; height: 180px; border-radius: 24px; object-fit: cover; background: #333; }
+.content-box { flex: 1; display: flex; flex-direction: column; padding-top: 8px; }
+.nickname { font-size: 64px; font-weight: 600; color: #7CA0C8; margin-bottom: 30px; line-height: 1.2; }
+.text-body { font-size: 70px; color: #FFFFFF; line-height: 1.5; margin-bottom: 50px; word-wrap: break-word; white-space: pre-wrap; }
+.footer-info { font-size: 40px; color: #777777; display: flex; align-items: center; justify-content: space-between; width: 100%; margin-top: 15px; }
+.count-tag {
+    display: inline-block; background: #222; color: #888;
+    padding: 8px 24px; border-radius: 12px; border: 1px solid #333;
+    box-shadow: 8px 8px 0px rgba(255, 255, 255, 0.1); 
+    font-family: 'Noto Sans SC', sans-serif; font-size: 36px; font-weight: bold; letter-spacing: 2px;
+}
+"""
+
+_VERTICAL_CSS = """
+body { 
+    width: 100%; min-height: ${min_height}px; height: auto;
+    display: flex; flex-direction: column; align-items: center; justify-content: center;
+    padding: 80px; background: #121212;
+}
+.card {
+    width: 100%; background: #1E1E1E; border-radius: 24px;
+    box-shadow: 0 10px 30px rgba(0,0,0,0.3); border: 1px solid #2A2A2A;
+    overflow: hidden; position: relative;
+}
+.card-top-bar { height: 12px; width: 100%; background: linear-gradient(90deg, #5E81AC, #88C0D0); }
+.header { padding: 40px 60px 20px 60px; display: flex; align-items: center; border-bottom: 1px solid #2A2A2A; }
+.avatar { width: 100px; height: 100px; border-radius: 20px; object-fit: cover; border: 3px solid #333; margin-right: 30px; }
+.user-info { display: flex; flex-direction: column; flex: 1; }
+.username { font-size: 38px; font-weight: 600; color: #7CA0C8; }
+.info-bar { display: flex; align-items: center; justify-content: space-between; width: 100%; margin-top: 10px; }
+.time-text { font-size: 26px; color: #666; }
+.content-area { padding: 60px 80px 80px 80px; min-height: 400px; display: flex; flex-direction: column; justify-content: center; }
+.quote-text { font-size: 42px; line-height: 1.6; color: #E0E0E0; text-align: justify; word-wrap: break-word; white-space: pre-wrap; }
+.footer-deco { position: absolute; bottom: 30px; right: 40px; font-family: "Times New Roman", serif; font-size: 140px; color: #252525; opacity: 0.5; pointer-events: none; line-height: 1; }
+.count-tag {
+    display: inline-block; background: #222; color: #888;
+    padding: 4px 14px; border-radius: 8px; border: 1px solid #333;
+    box-shadow: 5px 5px 0px rgba(255, 255, 255, 0.1); 
+    font-family: 'Noto Sans SC', sans-serif; font-size: 26px; font-weight: bold; letter-spacing: 1px;
+}
+"""
+
+_MERGED_CSS = """
+body {
+    width: 100%; min-height: 100vh; color: #fff;
+    display: flex; flex-direction: column; align-items: center; 
+    background-color: #121212;
+}
+.main-wrapper {
+    width: 100%; display: flex; flex-direction: column; align-items: center;
+    background-color: #121212; flex: 1; padding-bottom: 60px;
+}
+.header {
+    width: 100%; padding: 80px 50px 50px 50px;
+    display: flex; align-items: center; background-color: #1E1E1E; border-bottom: 1px solid #2C2C2C;
+}
+.avatar {
+    width: 130px; height: 130px; border-radius: 20px; object-fit: cover; background: #333; margin-right: 40px; flex-shrink: 0;
+}
+.header-info {
+    display: flex; flex-direction: column; justify-content: center; max-width: calc(100% - 170px); 
+}
+.title {
+    font-size: 52px; font-weight: 600; color: #fff; margin-bottom: 15px; line-height: 1.2; word-break: break-word;
+}
+.subtitle { font-size: 32px; color: #888; }
+.list-container {
+    width: 100%; padding: 50px 50px 0 50px; display: flex; flex-direction: column; gap: 36px;
+}
+.card {
+    background-color: #1E1E1E; border-radius: 24px; padding: 40px;
+    box-shadow: 0 6px 16px rgba(0,0,0,0.25); border: 1px solid #2A2A2A; width: 100%;
+}
+.card-header { display: flex; justify-content: flex-start; align-items: center; margin-bottom: 25px; }
+.index-tag {
+    font-size: 28px; font-weight: bold; color: #5E81AC; background: rgba(94, 129, 172, 0.15); padding: 6px 16px; border-radius: 8px;
+}
+.card-content {
+    line-height: 1.5; color: #E0E0E0; font-weight: 400; text-align: left;
+    word-wrap: break-word; word-break: break-word; white-space: pre-wrap; margin-bottom: 20px;
+}
+.ai-reason {
+    margin-top: 15px; margin-bottom: 20px; padding: 16px 20px;
+    background: rgba(255, 255, 255, 0.05);
+    border-left: 6px solid #d08770;
+    color: #aaa; font-size: 28px;
+    border-radius: 4px; line-height: 1.4;
+}
+.card-divider {
+    width: 100%; height: 1px; background: #333; margin: 25px 0 20px 0;
+}
+.card-footer-bar {
+    display: flex; align-items: center; justify-content: space-between;
+    width: 100%;
+}
+.footer-time {
+    font-size: 26px; color: #777; font-weight: 400;
+}
+.footer-author-box {
+    display: flex; align-items: center;
+}
+.footer-author-name {
+    font-size: 28px; color: #7CA0C8; margin-right: 15px;
+}
+.footer-avatar {
+    width: 60px; height: 60px; border-radius: 10px; object-fit: cover; border: 1px solid #444;
+}
+"""
+
+# 布局A：朋友圈/Feed流风格
+_FEED_BODY = """
+<div class="feed-container">
+    <div class="avatar-box"><img class="avatar" src="${avatar_url}"></div>
+    <div class="content-box">
+        <div class="nickname">${safe_name}</div>
+        <div class="text-body">${safe_text}</div>
+        <div class="footer-info">
+            <span>${time_text}</span>
+            <span class="count-tag">${count_text}</span>
+        </div>
+    </div>
+</div>
+"""
+
+# 布局B：垂直宽幅卡片
+_VERTICAL_BODY = """
+<div class="card">
+    <div class="card-top-bar"></div>
+    <div class="header">
+        <img class="avatar" src="${avatar_url}">
+        <div class="user-info">
+            <div class="username">${safe_name}</div>
+            <div class="info-bar">
+                <span class="time-text">${time_text}</span>
+                <span class="count-tag">${count_text}</span>
+            </div>
+        </div>
+    </div>
+    <div class="content-area"><div class="quote-text">${safe_text}</div></div>
+    <div class="footer-deco">”</div>
+</div>
+"""
+
+# 合集长图
+_MERGED_BODY = """
+<div class="main-wrapper">
+    <div class="header">
+        <img class="avatar" src="${avatar_url}">
+        <div class="header-info">
+            <div class="title">${safe_name}</div>
+            <div class="subtitle">本次抽取了 ${total} 条语录</div>
+        </div>
+    </div>
+    <div class="list-container">${quotes_list_html}</div>
+</div>
+"""
+
+# 合集长图中的单条语录
+_MERGED_ITEM_TEMPLATE = Template("""
+<div class="card">
+    <div class="card-header"><span class="index-tag">#${index}</span></div>
+    <div class="card-content" style="font-size: ${item_font_size}px;">${safe_text}</div>
+    ${reason_html}
+    <div class="card-divider"></div>
+    <div class="card-footer-bar">
+        <span class="footer-time">${time_text}</span>
+        ${right_side_html}
+    </div>
+</div>
+""")
+
+# 合集长图中单条语录的作者信息 (show_author 时显示)
+_MERGED_AUTHOR_TEMPLATE = Template("""
+<div class="footer-author-box">
+    <span class="footer-author-name">${safe_name}</span>
+    <img class="footer-avatar" src="${avatar_url}">
+</div>
+""")
+
+@lru_cache(maxsize=4096)
+def _format_ts(ts: int) -> str:
+    """按整秒缓存时间文本 (只显示到分钟)，合集与重复渲染中相同时间戳直接命中"""
+    tm = _localtime(ts)
+    return f"{_TWO_DIGIT[tm.tm_mday]} {_MONTHS[tm.tm_mon]} {tm.tm_year} {_TWO_DIGIT[tm.tm_hour]}:{_TWO_DIGIT[tm.tm_min]}"
+
+# 头像防缓存参数的时间粒度 (秒)：同一时段内 URL 保持不变，渲染端可复用已下载的头像
+_AVATAR_REFRESH_INTERVAL = 3600
+
+@lru_cache(maxsize=2048)
+def _avatar_url(qq: str, bucket: int) -> Optional[str]:
+    """QQ 头像地址 (bucket 为防缓存参数)；非数字 QQ 返回 None。合集中同一作者反复出现时直接命中缓存"""
+    if qq and qq.isdigit():
+        return f"https://q1.qlogo.cn/g?b=qq&nk={qq}&s=640&v={bucket}"
+    return None
+
+def _is_long_text(text: str) -> bool:
+    """超过 60 字或多于 4 个换行视为长文本；走到 count 时文本不超过 60 字，扫描长度有界"""
+    n = len(text)
+    return n > 60 or (n > 4 and text.count("\n") > 4)
+
+# 布局注册表：布局名 -> (样式表, 页面主体, 样式变量)，由 _build_templates 编译进 _TEMPLATES
+_LAYOUTS: Dict[str, Tuple[str, str, Dict[str, Any]]] = {
+    "feed": (_FEED_CSS, _FEED_BODY, {"width": _FEED_WIDTH}),
+    "vertical": (_VERTICAL_CSS, _VERTICAL_BODY, {"min_height": _VERTICAL_MIN_HEIGHT}),
+    "merged": (_MERGED_CSS, _MERGED_BODY, {}),
+}
+_TEMPLATES: Dict[str, Template] = {}
+# 可用于单条语录的布局
+_SINGLE_STYLES = ("feed", "vertical")
+
+def _build_templates():
+    for name, (css, body, css_vars) in _LAYOUTS.items():
+        _TEMPLATES[name] = _compile(css, body, **css_vars)
+
+_build_templates()
+
+# 截图参数为固定常量，所有渲染共用同一对象 (调用方不应修改)
+_OPTIONS: Dict[str, Dict[str, Any]] = {
+    "feed": {"full_page": True, "viewport": {"width": _FEED_WIDTH, "height": 1}},
+    "vertical": {"full_page": True, "viewport": {"width": _VERTICAL_WIDTH, "height": _VERTICAL_MIN_HEIGHT}},
+}
+_MERGED_OPTIONS: Dict[str, Any] = {"full_page": True, "viewport": {"width": _MERGED_WIDTH, "height": 1000}}
+
 class QuoteRenderer:
     """视图层：负责生成 HTML 和渲染配置"""
     
@@ -24,287 +337,114 @@ class QuoteRenderer:
     DEFAULT_AVATAR_URI: str = "https://foruda.gitee.com/avatar/1677741748064414527/6651576_soulter_1578959926.png"
 
     @staticmethod
-    def render_single_card(q: Quote, index: int, total: int) -> Tuple[str, Dict[str, Any]]:
-        """渲染单条语录"""
-        is_long_text = len(q.text) > 60 or q.text.count('\n') > 4
-        
-        if is_long_text:
-            return QuoteRenderer._render_vertical_card(q, index, total)
-        else:
-            return QuoteRenderer._render_feed_card(q, index, total)
+    def use_local_fonts(font_paths: List[Path]):
+        """
+        改用本地字体文件，每个文件生成一条按文件名确定字重的 @font-face。
+        字体以 base64 data URI 内嵌进页面，远程渲染服务无需访问插件目录；代价是每次渲染的页面体积相应增大。
+        """
+        global _font_css
+        _font_css = "".join(
+            "@font-face { font-family: 'Noto Sans SC'; "
+            f"font-weight: {_font_weight(path)}; font-display: block; "
+            f"src: url('data:font/woff2;base64,{base64.b64encode(path.read_bytes()).decode('ascii')}') format('woff2'); }}"
+            for path in font_paths
+        )
+        _build_templates()
+        QuoteRenderer._render_layout_cached.cache_clear()
+
+    @staticmethod
+    def render_single_card(q: Quote, index: int, total: int, style: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        渲染单条语录。
+        style 可指定 "feed" (朋友圈风格) 或 "vertical" (垂直卡片)，留空则按文本长度自动选择。
+        """
+        if style not in _SINGLE_STYLES:
+            style = "vertical" if _is_long_text(q.text) else "feed"
+        return QuoteRenderer._render_layout(q, index, total, style)
 
     @staticmethod
     def _get_time_text(created_at: float) -> str:
-        try:
-            dt = datetime.fromtimestamp(created_at)
-            months = ["", "Jan", "Feb", "Mar", "Apr", "May", "Jun", 
-                      "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-            month_str = months[dt.month]
-            return f"{dt.day:02d} {month_str} {dt.year} {dt.strftime('%H:%M')}"
-        except:
+        # 时间戳来自本地存储，只需排除缺失/非数值/超出可表示范围的值
+        if not isinstance(created_at, (int, float)) or not 0 < created_at < _MAX_TIMESTAMP:
             return ""
+        return _format_ts(int(created_at))
 
     @staticmethod
     def _get_avatar_url(qq: str) -> str:
         """
         获取头像 URL。
         """
-        if qq and qq.isdigit():
-            timestamp = int(time.time())
-            return f"https://q1.qlogo.cn/g?b=qq&nk={qq}&s=640&v={timestamp}"
+        url = _avatar_url(qq, int(_now()) // _AVATAR_REFRESH_INTERVAL)
+        if url:
+            return url
         else:
             # [修改] 优先使用注入的本地 URI，否则回退到 CDN
             return QuoteRenderer.DEFAULT_AVATAR_URI
 
     @staticmethod
-    def _render_feed_card(q: Quote, index: int, total: int) -> Tuple[str, Dict[str, Any]]:
-        """布局A：朋友圈/Feed流风格"""
-        width = 1500
+    def _render_layout(q: Quote, index: int, total: int, style: str) -> Tuple[str, Dict[str, Any]]:
+        """按布局名从模板注册表中取出模板并渲染单条语录"""
         avatar_url = QuoteRenderer._get_avatar_url(q.qq)
-        
-        safe_text = html.escape(q.text)
-        safe_name = html.escape(q.name)
+        # 以格式化后的时间文本 (精确到分钟) 而非原始浮点时间戳作为缓存键，提高命中率
         time_text = QuoteRenderer._get_time_text(q.created_at)
+        html_content = QuoteRenderer._render_layout_cached(
+            avatar_url, q.text, q.name, time_text, index, total, style
+        )
+        return html_content, _OPTIONS[style]
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _render_layout_cached(avatar_url: str, text: str, name: str, time_text: str,
+                              index: int, total: int, style: str) -> str:
+        """单条语录渲染是输入的纯函数，按全部输入字段缓存结果，重复抽中同一条时直接复用"""
         count_text = f"#{index} / {total}" if total > 0 else "AstrBot"
-        
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                {COMMON_CSS}
-                body {{
-                    width: {width}px; max-width: {width}px;
-                    padding: 100px;
-                    display: flex; flex-direction: column;
-                }}
-                .feed-container {{ width: 100%; display: flex; flex-direction: row; align-items: flex-start; }}
-                .avatar-box {{ margin-right: 60px; flex-shrink: 0; }}
-                .avatar {{ width: 180px; height: 180px; border-radius: 24px; object-fit: cover; background: #333; }}
-                .content-box {{ flex: 1; display: flex; flex-direction: column; padding-top: 8px; }}
-                .nickname {{ font-size: 64px; font-weight: 600; color: #7CA0C8; margin-bottom: 30px; line-height: 1.2; }}
-                .text-body {{ font-size: 70px; color: #FFFFFF; line-height: 1.5; margin-bottom: 50px; word-wrap: break-word; white-space: pre-wrap; }}
-                .footer-info {{ font-size: 40px; color: #777777; display: flex; align-items: center; justify-content: space-between; width: 100%; margin-top: 15px; }}
-                .count-tag {{
-                    display: inline-block; background: #222; color: #888;
-                    padding: 8px 24px; border-radius: 12px; border: 1px solid #333;
-                    box-shadow: 8px 8px 0px rgba(255, 255, 255, 0.1); 
-                    font-family: 'Noto Sans SC', sans-serif; font-size: 36px; font-weight: bold; letter-spacing: 2px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="feed-container">
-                <div class="avatar-box"><img class="avatar" src="{avatar_url}"></div>
-                <div class="content-box">
-                    <div class="nickname">{safe_name}</div>
-                    <div class="text-body">{safe_text}</div>
-                    <div class="footer-info">
-                        <span>{time_text}</span>
-                        <span class="count-tag">{count_text}</span>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        options = {"full_page": True, "viewport": {"width": width, "height": 1}}
-        return html_content, options
+        return _TEMPLATES[style].substitute(_EscapedFields(
+            avatar_url=avatar_url, name=name, text=text, time_text=time_text, count_text=count_text,
+        ))
 
     @staticmethod
-    def _render_vertical_card(q: Quote, index: int, total: int) -> Tuple[str, Dict[str, Any]]:
-        """布局B：垂直宽幅卡片"""
-        width = 1500  
-        min_height = 800
-        avatar_url = QuoteRenderer._get_avatar_url(q.qq)
+    def _merged_item_fields(index: int, q: Quote, right_side_html: str) -> Dict[str, Any]:
+        """计算合集长图中单条语录的模板字段 (作者信息由调用方按作者预先生成)"""
+        text = q.text
+        reason_html = ""
+        reason = getattr(q, "ai_reason", None)
+        if reason:
+            safe_reason = _escape(reason)
+            reason_html = f'<div class="ai-reason">💡 <b>Bot:</b> {safe_reason}</div>'
 
-        safe_text = html.escape(q.text)
-        safe_name = html.escape(q.name)
-        time_text = QuoteRenderer._get_time_text(q.created_at)
-        count_text = f"#{index} / {total}" if total > 0 else "AstrBot"
-        
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                {COMMON_CSS}
-                body {{ 
-                    width: 100%; min-height: {min_height}px; height: auto;
-                    display: flex; flex-direction: column; align-items: center; justify-content: center;
-                    padding: 80px; background: #121212;
-                }}
-                .card {{
-                    width: 100%; background: #1E1E1E; border-radius: 24px;
-                    box-shadow: 0 10px 30px rgba(0,0,0,0.3); border: 1px solid #2A2A2A;
-                    overflow: hidden; position: relative;
-                }}
-                .card-top-bar {{ height: 12px; width: 100%; background: linear-gradient(90deg, #5E81AC, #88C0D0); }}
-                .header {{ padding: 40px 60px 20px 60px; display: flex; align-items: center; border-bottom: 1px solid #2A2A2A; }}
-                .avatar {{ width: 100px; height: 100px; border-radius: 20px; object-fit: cover; border: 3px solid #333; margin-right: 30px; }}
-                .user-info {{ display: flex; flex-direction: column; flex: 1; }}
-                .username {{ font-size: 38px; font-weight: 600; color: #7CA0C8; }}
-                .info-bar {{ display: flex; align-items: center; justify-content: space-between; width: 100%; margin-top: 10px; }}
-                .time-text {{ font-size: 26px; color: #666; }}
-                .content-area {{ padding: 60px 80px 80px 80px; min-height: 400px; display: flex; flex-direction: column; justify-content: center; }}
-                .quote-text {{ font-size: 42px; line-height: 1.6; color: #E0E0E0; text-align: justify; word-wrap: break-word; white-space: pre-wrap; }}
-                .footer-deco {{ position: absolute; bottom: 30px; right: 40px; font-family: "Times New Roman", serif; font-size: 140px; color: #252525; opacity: 0.5; pointer-events: none; line-height: 1; }}
-                .count-tag {{
-                    display: inline-block; background: #222; color: #888;
-                    padding: 4px 14px; border-radius: 8px; border: 1px solid #333;
-                    box-shadow: 5px 5px 0px rgba(255, 255, 255, 0.1); 
-                    font-family: 'Noto Sans SC', sans-serif; font-size: 26px; font-weight: bold; letter-spacing: 1px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="card">
-                <div class="card-top-bar"></div>
-                <div class="header">
-                    <img class="avatar" src="{avatar_url}">
-                    <div class="user-info">
-                        <div class="username">{safe_name}</div>
-                        <div class="info-bar">
-                            <span class="time-text">{time_text}</span>
-                            <span class="count-tag">{count_text}</span>
-                        </div>
-                    </div>
-                </div>
-                <div class="content-area"><div class="quote-text">{safe_text}</div></div>
-                <div class="footer-deco">”</div>
-            </div>
-        </body>
-        </html>
-        """
-        options = {"full_page": True, "viewport": {"width": width, "height": min_height}}
-        return html_content, options
+        return {
+            "index": index,
+            "item_font_size": _MERGED_FONT_SIZE if len(text) < _MERGED_SHORT_TEXT_LEN else _MERGED_FONT_SIZE_LONG,
+            "safe_text": _escape(text),
+            "reason_html": reason_html,
+            "time_text": QuoteRenderer._get_time_text(q.created_at),
+            "right_side_html": right_side_html,
+        }
 
     @staticmethod
     def render_merged_card(quotes: List[Quote], qq: str, name: str, show_author: bool = False) -> Tuple[str, Dict[str, Any]]:
         """渲染合集长图"""
         avatar_url = QuoteRenderer._get_avatar_url(qq)
-        safe_name = html.escape(name)
-        view_width = 1000
+        safe_name = _escape(name)
         
-        quotes_list_html = ""
-        for i, q in enumerate(quotes):
-            text = html.escape(q.text)
-            if not text: continue
-            
-            item_font_size = 46 if len(q.text) < 50 else 38
-            
-            reason_html = ""
-            if hasattr(q, "ai_reason") and q.ai_reason:
-                safe_reason = html.escape(q.ai_reason)
-                reason_html = f'<div class="ai-reason">💡 <b>Bot:</b> {safe_reason}</div>'
-
-            time_text = QuoteRenderer._get_time_text(q.created_at)
-            
-            right_side_html = ""
-            if show_author:
-                sub_avatar_url = QuoteRenderer._get_avatar_url(q.qq)
-                right_side_html = f"""
-                <div class="footer-author-box">
-                    <span class="footer-author-name">{html.escape(q.name)}</span>
-                    <img class="footer-avatar" src="{sub_avatar_url}">
-                </div>
-                """
-            
-            quotes_list_html += f"""
-            <div class="card">
-                <div class="card-header"><span class="index-tag">#{i+1}</span></div>
-                <div class="card-content" style="font-size: {item_font_size}px;">{text}</div>
-                {reason_html}
-                <div class="card-divider"></div>
-                <div class="card-footer-bar">
-                    <span class="footer-time">{time_text}</span>
-                    {right_side_html}
-                </div>
-            </div>
-            """
-
-        html_content = f"""
-        <html>
-        <head>
-            <style>
-                {COMMON_CSS}
-                body {{
-                    width: 100%; min-height: 100vh; color: #fff;
-                    display: flex; flex-direction: column; align-items: center; 
-                    background-color: #121212;
-                }}
-                .main-wrapper {{
-                    width: 100%; display: flex; flex-direction: column; align-items: center;
-                    background-color: #121212; flex: 1; padding-bottom: 60px;
-                }}
-                .header {{
-                    width: 100%; padding: 80px 50px 50px 50px;
-                    display: flex; align-items: center; background-color: #1E1E1E; border-bottom: 1px solid #2C2C2C;
-                }}
-                .avatar {{
-                    width: 130px; height: 130px; border-radius: 20px; object-fit: cover; background: #333; margin-right: 40px; flex-shrink: 0;
-                }}
-                .header-info {{
-                    display: flex; flex-direction: column; justify-content: center; max-width: calc(100% - 170px); 
-                }}
-                .title {{
-                    font-size: 52px; font-weight: 600; color: #fff; margin-bottom: 15px; line-height: 1.2; word-break: break-word;
-                }}
-                .subtitle {{ font-size: 32px; color: #888; }}
-                .list-container {{
-                    width: 100%; padding: 50px 50px 0 50px; display: flex; flex-direction: column; gap: 36px;
-                }}
-                .card {{
-                    background-color: #1E1E1E; border-radius: 24px; padding: 40px;
-                    box-shadow: 0 6px 16px rgba(0,0,0,0.25); border: 1px solid #2A2A2A; width: 100%;
-                }}
-                .card-header {{ display: flex; justify-content: flex-start; align-items: center; margin-bottom: 25px; }}
-                .index-tag {{
-                    font-size: 28px; font-weight: bold; color: #5E81AC; background: rgba(94, 129, 172, 0.15); padding: 6px 16px; border-radius: 8px;
-                }}
-                .card-content {{
-                    line-height: 1.5; color: #E0E0E0; font-weight: 400; text-align: left;
-                    word-wrap: break-word; word-break: break-word; white-space: pre-wrap; margin-bottom: 20px;
-                }}
-                .ai-reason {{
-                    margin-top: 15px; margin-bottom: 20px; padding: 16px 20px;
-                    background: rgba(255, 255, 255, 0.05);
-                    border-left: 6px solid #d08770;
-                    color: #aaa; font-size: 28px;
-                    border-radius: 4px; line-height: 1.4;
-                }}
-                .card-divider {{
-                    width: 100%; height: 1px; background: #333; margin: 25px 0 20px 0;
-                }}
-                .card-footer-bar {{
-                    display: flex; align-items: center; justify-content: space-between;
-                    width: 100%;
-                }}
-                .footer-time {{
-                    font-size: 26px; color: #777; font-weight: 400;
-                }}
-                .footer-author-box {{
-                    display: flex; align-items: center;
-                }}
-                .footer-author-name {{
-                    font-size: 28px; color: #7CA0C8; margin-right: 15px;
-                }}
-                .footer-avatar {{
-                    width: 60px; height: 60px; border-radius: 10px; object-fit: cover; border: 1px solid #444;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="main-wrapper">
-                <div class="header">
-                    <img class="avatar" src="{avatar_url}">
-                    <div class="header-info">
-                        <div class="title">{safe_name}</div>
-                        <div class="subtitle">本次抽取了 {len(quotes)} 条语录</div>
-                    </div>
-                </div>
-                <div class="list-container">{quotes_list_html}</div>
-            </div>
-        </body>
-        </html>
-        """
-        options = {"full_page": True, "viewport": {"width": view_width, "height": 1000}}
-        return html_content, options
+        # 先一次性筛出非空语录及其序号，再逐条填充条目模板并整体拼接
+        items = [(i + 1, q, (q.name, q.qq)) for i, q in enumerate(quotes) if q.text]
+        # 作者信息按 (名片, QQ) 只生成一次，同一作者的多条语录共用
+        authors: Dict[Tuple[str, str], str] = {}
+        if show_author:
+            for _, _, key in items:
+                if key not in authors:
+                    author_name, author_qq = key
+                    authors[key] = _MERGED_AUTHOR_TEMPLATE.substitute(
+                        safe_name=_escape(author_name), avatar_url=QuoteRenderer._get_avatar_url(author_qq),
+                    )
+        substitute, item_fields = _MERGED_ITEM_TEMPLATE.substitute, QuoteRenderer._merged_item_fields
+        quotes_list_html = "".join([
+            substitute(item_fields(index, q, authors.get(key, ""))) for index, q, key in items
+        ])
+
+        html_content = _TEMPLATES["merged"].substitute(
+            avatar_url=avatar_url, safe_name=safe_name,
+            total=len(quotes), quotes_list_html=quotes_list_html,
+        )
+        return html_content, _MERGED_OPTIONS